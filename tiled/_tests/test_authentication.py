@@ -4,14 +4,18 @@ import shutil
 import subprocess
 import sys
 import time
+from datetime import timedelta
 
 import numpy
 import pytest
+from fastapi import HTTPException
 from starlette.status import (
+    HTTP_200_OK,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
     HTTP_422_UNPROCESSABLE_ENTITY,
 )
+from starlette.testclient import TestClient
 
 from ..adapters.array import ArrayAdapter
 from ..adapters.mapping import MapAdapter
@@ -19,7 +23,8 @@ from ..client import Context, from_context
 from ..client.auth import CannotRefreshAuthentication
 from ..client.context import clear_default_identity, get_default_identity
 from ..server import authentication
-from ..server.app import build_app_from_config
+from ..server.app import build_app, build_app_from_config
+from ..server.settings import Settings
 from .utils import fail_with_status_code
 
 arr = ArrayAdapter.from_array(numpy.ones((5, 5)))
@@ -163,6 +168,176 @@ def test_key_rotation(enter_password, config):
         from_context(context, username="alice")
 
 
+def test_decode_token():
+    "Tokens are rejected unless they are well-formed and signed by one of our keys."
+    old_key, new_key = b"OLD_SECRET", b"NEW_SECRET"
+    token = authentication.create_access_token({"sub": "alice"}, old_key, 60)
+    payload = authentication.decode_token(token, (new_key, old_key))
+    assert payload["sub"] == "alice"
+    assert payload["type"] == "access"
+    header, _, signature = token.split(".")
+    forged_payload = authentication.base64url_encode(
+        b'{"sub":"mallory","exp":9999999999,"type":"access"}'
+    ).decode()
+    unsigned_header = authentication.base64url_encode(
+        b'{"alg":"none","typ":"JWT"}'
+    ).decode()
+    for bad_token in [
+        "",
+        "not-a-token",
+        token + ".extra",
+        "\u00e9" + token,
+        f"{header}.{forged_payload}.{signature}",
+        f"{unsigned_header}.{forged_payload}.",
+    ]:
+        with pytest.raises(HTTPException) as exc_info:
+            authentication.decode_token(bad_token, (old_key,))
+        assert exc_info.value.status_code == HTTP_401_UNAUTHORIZED
+    # Valid signature from a key that has been rotated out
+    with pytest.raises(HTTPException):
+        authentication.decode_token(token, (new_key,))
+    # No keys configured
+    with pytest.raises(HTTPException) as exc_info:
+        authentication.decode_token(token, ())
+    assert exc_info.value.status_code == HTTP_401_UNAUTHORIZED
+    expired_token = authentication.create_access_token({"sub": "alice"}, old_key, -1)
+    with pytest.raises(authentication.ExpiredSignatureError):
+        authentication.decode_token(expired_token, (old_key,))
+
+
+def test_settings_derived_values_follow_reassignment():
+    "Values derived from settings are recomputed when the settings change."
+    settings = Settings(
+        secret_keys=["OLD_SECRET"], access_token_max_age=timedelta(seconds=5)
+    )
+    assert settings.secret_keys_bytes == (b"OLD_SECRET",)
+    assert settings.access_token_max_age_seconds == 5
+    # build_app reassigns settings in place, as for key rotation.
+    settings.secret_keys = ["NEW_SECRET", "OLD_SECRET"]
+    settings.access_token_max_age = timedelta(seconds=7)
+    settings.refresh_token_max_age = timedelta(seconds=11)
+    assert settings.secret_keys_bytes == (b"NEW_SECRET", b"OLD_SECRET")
+    assert settings.access_token_max_age_seconds == 7
+    assert settings.refresh_token_max_age_seconds == 11
+
+
+def test_single_user_api_key_non_ascii():
+    "A non-ASCII API key is rejected as invalid, not as a server error."
+    app = build_app(tree, authentication={"single_user_api_key": "secret"})
+    with TestClient(app=app) as client:
+        response = client.get("/api/v1/metadata/", params={"api_key": "\u00e9"})
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+        response = client.get("/api/v1/metadata/", params={"api_key": "secret"})
+        assert response.status_code == HTTP_200_OK
+        assert response.cookies["tiled_api_key"] == "secret"
+
+
+@pytest.mark.parametrize(
+    "params, headers, cookies, expected_status_code",
+    [
+        # An empty query parameter or cookie counts as missing.
+        ({"api_key": ""}, {}, {}, HTTP_200_OK),
+        ({}, {}, {"tiled_api_key": ""}, HTTP_200_OK),
+        ({"api_key": ""}, {"Authorization": "Apikey secret"}, {}, HTTP_200_OK),
+        # Sources are consulted in order: query, header, cookie.
+        (
+            {"api_key": "bad"},
+            {"Authorization": "Apikey secret"},
+            {},
+            HTTP_401_UNAUTHORIZED,
+        ),
+        (
+            {},
+            {"Authorization": "Apikey bad"},
+            {"tiled_api_key": "secret"},
+            HTTP_401_UNAUTHORIZED,
+        ),
+        ({}, {}, {"tiled_api_key": "secret"}, HTTP_200_OK),
+        ({}, {"Authorization": "apikey secret"}, {}, HTTP_200_OK),
+        ({}, {"Authorization": "Basic secret"}, {}, HTTP_400_BAD_REQUEST),
+    ],
+)
+def test_single_user_api_key_sources(params, headers, cookies, expected_status_code):
+    "The API key is read from the query, the header, or the cookie, in that order."
+    app = build_app(
+        tree,
+        authentication={
+            "single_user_api_key": "secret",
+            "allow_anonymous_access": True,
+        },
+    )
+    with TestClient(app=app) as client:
+        for name, value in cookies.items():
+            client.cookies.set(name, value)
+        response = client.get("/api/v1/metadata/", params=params, headers=headers)
+        assert response.status_code == expected_status_code
+
+
+@pytest.mark.parametrize("authorization", ["Apikey", "Apikey "])
+def test_single_user_empty_api_key(authorization):
+    "An empty API key in the Authorization header is rejected, not ignored."
+    app = build_app(
+        tree,
+        authentication={
+            "single_user_api_key": "secret",
+            "allow_anonymous_access": True,
+        },
+    )
+    with TestClient(app=app) as client:
+        response = client.get(
+            "/api/v1/metadata/", headers={"Authorization": authorization}
+        )
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+        # Without the header, anonymous access is allowed.
+        response = client.get("/api/v1/metadata/")
+        assert response.status_code == HTTP_200_OK
+
+
+def test_single_user_rejects_bearer_token():
+    "A server with no authentication providers does not ignore a Bearer token."
+    app = build_app(
+        tree,
+        authentication={"single_user_api_key": "secret", "secret_keys": ["SECRET"]},
+    )
+    token = authentication.create_access_token({"sub": "alice"}, b"SECRET", 60)
+    with TestClient(app=app) as client:
+        response = client.get(
+            "/api/v1/metadata/", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+        response = client.get("/api/v1/metadata/", headers={"Authorization": "Bearer"})
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+        response = client.get(
+            "/api/v1/metadata/", headers={"Authorization": "Apikey secret"}
+        )
+        assert response.status_code == HTTP_200_OK
+
+
+def test_decode_token_cached_expiration():
+    "A token that expires while it is cached is rejected."
+    key = b"SECRET"
+    token = authentication.create_access_token({"sub": "expires-soon"}, key, 2)
+    payload = authentication.decode_token_cached(token, (key,))
+    assert payload["sub"] == "expires-soon"
+    time.sleep(3)
+    with pytest.raises(authentication.ExpiredSignatureError):
+        authentication.decode_token_cached(token, (key,))
+
+
+def test_decode_token_cached_key_rotation():
+    "A cached token is not accepted under keys that do not verify it."
+    old_key, new_key = b"OLD_SECRET", b"NEW_SECRET"
+    token = authentication.create_access_token({"sub": "rotated-out"}, old_key, 60)
+    payload = authentication.decode_token_cached(token, (old_key,))
+    assert payload["sub"] == "rotated-out"
+    with pytest.raises(HTTPException) as exc_info:
+        authentication.decode_token_cached(token, (new_key,))
+    assert exc_info.value.status_code == HTTP_401_UNAUTHORIZED
+    # The token is still accepted while the old key remains in the rotation.
+    payload = authentication.decode_token_cached(token, (new_key, old_key))
+    assert payload["sub"] == "rotated-out"
+
+
 def test_refresh_forced(enter_password, config):
     "Forcing refresh obtains new token."
     with Context.from_app(build_app_from_config(config)) as context:
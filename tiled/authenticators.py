@@ -99,8 +99,14 @@ properties:
     async def authenticate(self, username: str, password: str) -> UserSessionState:
         import pamela
 
+        # PAM calls block, so keep them off the event loop.
         try:
-            pamela.authenticate(username, password, service=self.service)
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    pamela.authenticate, username, password, service=self.service
+                ),
+            )
         except pamela.PAMError:
             # Authentication failed.
             return
@@ -19,6 +19,7 @@ from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import FileResponse
@@ -40,7 +41,14 @@ from ..media_type_registration import (
 from ..utils import SHARE_TILED_PATH, Conflicts, UnsupportedQueryType
 from ..validation_registration import validation_registry as default_validation_registry
 from . import schemas
-from .authentication import get_current_principal
+from .authentication import (
+    API_KEY_SECURITY_SCHEMES,
+    get_api_key,
+    get_current_principal,
+    get_current_principal_single_user,
+    get_decoded_access_token,
+    get_decoded_access_token_single_user,
+)
 from .compression import CompressionMiddleware
 from .core import PatchedStreamingResponse
 from .dependencies import (
@@ -99,10 +107,31 @@ def custom_openapi(app):
     openapi_schema["components"]["securitySchemes"]["OAuth2PasswordBearer"]["flows"][
         "password"
     ]["refreshUrl"] = "token/refresh"
+    # API keys are read directly from the request, not through FastAPI security
+    # dependencies, so FastAPI cannot document them. Add them.
+    openapi_schema["components"]["securitySchemes"].update(API_KEY_SECURITY_SCHEMES)
+    for route in app.routes:
+        if not (isinstance(route, APIRoute) and route.include_in_schema):
+            continue
+        if not _depends_on(route.dependant, get_api_key):
+            continue
+        for method in route.methods:
+            operation = openapi_schema["paths"][route.path_format][method.lower()]
+            operation.setdefault("security", []).extend(
+                {scheme_name: []} for scheme_name in API_KEY_SECURITY_SCHEMES
+            )
     app.openapi_schema = openapi_schema
     return app.openapi_schema
 
 
+def _depends_on(dependant, call):
+    "Check whether a route's dependency tree includes some callable."
+    return any(
+        (sub_dependant.call is call) or _depends_on(sub_dependant, call)
+        for sub_dependant in dependant.dependencies
+    )
+
+
 def build_app(
     tree,
     authentication=None,
@@ -476,6 +505,25 @@ or via the environment variable TILED_SINGLE_USER_API_KEY.""",
         from .. import __version__
 
         logger.info(f"Tiled version {__version__}")
+        if authentication.get("providers"):
+            from .authentication import hmac_backend_info, warm_up_token_signing
+
+            # Every authenticated request verifies a token signed with
+            # HMAC-SHA256, so report which implementation is doing that work.
+            hmac_backend = hmac_backend_info()
+            if hmac_backend["openssl_version"] is None:
+                logger.warning(
+                    "hashlib is not backed by OpenSSL. Signing and verifying "
+                    "tokens will be slower than necessary."
+                )
+            else:
+                logger.info(
+                    f"Signing tokens with {hmac_backend['openssl_version']} "
+                    f"(OPENSSL_ia32cap={hmac_backend['openssl_ia32cap']})"
+                )
+            warm_up_token_signing(
+                app.dependency_overrides[get_settings]().secret_keys_bytes
+            )
         # Validate the single-user API key.
         settings = app.dependency_overrides[get_settings]()
         single_user_api_key = settings.single_user_api_key
@@ -758,6 +806,15 @@ Back up the database, and then run:
     app.dependency_overrides[get_authenticators] = override_get_authenticators
     app.dependency_overrides[get_root_tree] = override_get_root_tree
     app.dependency_overrides[get_settings] = override_get_settings
+    if not authentication.get("providers"):
+        # Without authentication providers, no access tokens are issued and
+        # there is no database of API keys. Skip that machinery on every request.
+        app.dependency_overrides[
+            get_current_principal
+        ] = get_current_principal_single_user
+        app.dependency_overrides[
+            get_decoded_access_token
+        ] = get_decoded_access_token_single_user
     if query_registry is not None:
 
         @lru_cache(1)
@@ -1,12 +1,20 @@
+import base64
 import enum
+import functools
 import hashlib
+import hmac
+import os
 import secrets
+import ssl
+import threading
+import time
 import uuid as uuid_module
-import warnings
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
+import cachetools
+import orjson
 import sqlalchemy.exc
 from fastapi import (
     APIRouter,
@@ -18,13 +26,12 @@ from fastapi import (
     Response,
     Security,
 )
-from fastapi.openapi.models import APIKey, APIKeyIn
+from fastapi.responses import ORJSONResponse
 from fastapi.security import (
     OAuth2PasswordBearer,
     OAuth2PasswordRequestForm,
     SecurityScopes,
 )
-from fastapi.security.api_key import APIKeyBase, APIKeyCookie, APIKeyQuery
 from fastapi.security.utils import get_authorization_scheme_param
 from fastapi.templating import Jinja2Templates
 from pydantic_settings import BaseSettings
@@ -39,15 +46,6 @@ from starlette.status import (
     HTTP_409_CONFLICT,
 )
 
-# To hide third-party warning
-# .../jose/backends/cryptography_backend.py:18: CryptographyDeprecationWarning:
-#     int_from_bytes is deprecated, use int.from_bytes instead
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore")
-    from jose import ExpiredSignatureError, JWTError, jwt
-
-from pydantic import BaseModel
-
 from ..authn_database import orm
 from ..authn_database.connection_pool import get_database_session
 from ..authn_database.core import (
@@ -67,7 +65,6 @@ from .settings import get_settings
 from .utils import API_KEY_COOKIE_NAME, get_authenticators, get_base_url
 
 ALGORITHM = "HS256"
-UNIT_SECOND = timedelta(seconds=1)
 
 # Max API keys and Sessions allowed to Principal.
 # This is here for at least two reasons:
@@ -80,126 +77,276 @@ SESSION_LIMIT = 200
 DEVICE_CODE_MAX_AGE = timedelta(minutes=15)
 DEVICE_CODE_POLLING_INTERVAL = 5  # seconds
 
+# Clients typically reuse one access token for many requests, so we remember
+# recently-verified tokens rather than checking the signature every time.
+# They are keyed on a digest of the token, not the token itself.
+# Items are evicted if:
+#
+# - They have been in the cache for more than a given time, or their token has
+#   expired, whichever comes first.
+# - The cache is at capacity and this item is the least recently used item.
+DECODED_TOKEN_CACHE_MAX_SIZE = 10_000
+DECODED_TOKEN_CACHE_TTU_SECONDS = 30
+
 
 def utcnow():
     "UTC now with second resolution"
     return datetime.utcnow().replace(microsecond=0)
 
 
+def hmac_backend_info():
+    """
+    Describe the implementation of SHA-256 used to sign and verify tokens.
+
+    When hashlib is backed by OpenSSL, OpenSSL picks the fastest SHA-256
+    routine supported by the CPU (e.g. the x86 SHA extensions) at runtime.
+    The environment variable OPENSSL_ia32cap, if set, overrides its CPU
+    feature detection.
+    """
+    if hashlib.sha256.__name__ == "openssl_sha256":
+        openssl_version = ssl.OPENSSL_VERSION
+    else:
+        # Python was built without OpenSSL and falls back to its own
+        # portable implementation.
+        openssl_version = None
+    return {
+        "openssl_version": openssl_version,
+        "openssl_ia32cap": os.getenv("OPENSSL_ia32cap"),
+    }
+
+
+class ExpiredSignatureError(Exception):
+    pass
+
+
 class Mode(enum.Enum):
     password = "password"
     external = "external"
 
 
-class Token(BaseModel):
-    access_token: str
-    token_type: str
+# The tokenUrl below is patched at app startup when we know it.
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="PLACEHOLDER", auto_error=False)
 
+API_KEY_QUERY_PARAMETER = "api_key"
+# API keys are read directly from the request in get_api_key. For the OpenAPI
+# schema, these are documented for any route that depends on get_api_key.
+API_KEY_SECURITY_SCHEMES = {
+    "APIKeyQuery": {"type": "apiKey", "in": "query", "name": API_KEY_QUERY_PARAMETER},
+    "APIKeyAuthorizationHeader": {
+        "type": "apiKey",
+        "in": "header",
+        "name": "Authorization",
+        "description": "Prefix value with 'Apikey ' as in, 'Apikey SECRET'",
+    },
+    "APIKeyCookie": {"type": "apiKey", "in": "cookie", "name": API_KEY_COOKIE_NAME},
+}
 
-class TokenData(BaseModel):
-    username: Optional[str] = None
 
+def base64url_encode(data):
+    "Base64url-encode bytes without padding, as JWTs require."
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
 
-class APIKeyAuthorizationHeader(APIKeyBase):
-    """
-    Expect a header like
 
-    Authorization: Apikey SECRET
+def base64url_decode(data):
+    "Base64url-decode bytes, restoring any padding that was stripped."
+    return base64.urlsafe_b64decode(data + b"===")
 
-    where Apikey is case-insensitive.
+
+# We only ever sign with one algorithm, so the JWT header is a constant.
+# Encode it once and build tokens from it directly, rather than letting PyJWT
+# look up the algorithm and serialize the header for each token.
+_JWT_HEADER_B64 = base64url_encode(orjson.dumps({"alg": ALGORITHM, "typ": "JWT"}))
+
+
+@functools.lru_cache(maxsize=16)
+def _keyed_hmac(secret_key):
     """
+    Return an HMAC-SHA256 object keyed with secret_key.
 
-    def __init__(
-        self,
-        *,
-        name: str,
-        scheme_name: Optional[str] = None,
-        description: Optional[str] = None,
-    ):
-        self.model: APIKey = APIKey(
-            **{"in": APIKeyIn.header}, name=name, description=description
-        )
-        self.scheme_name = scheme_name or self.__class__.__name__
-
-    async def __call__(self, request: Request) -> Optional[str]:
-        authorization: str = request.headers.get("Authorization")
-        scheme, param = get_authorization_scheme_param(authorization)
-        if not authorization or scheme.lower() == "bearer":
-            return None
-        if scheme.lower() != "apikey":
-            raise HTTPException(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail=(
-                    "Authorization header must include the authorization type "
-                    "followed by a space and then the secret, as in "
-                    "'Bearer SECRET' or 'Apikey SECRET'. "
-                ),
-            )
-        return param
+    Copy it to sign a message. This skips re-deriving the HMAC key material,
+    so, for example, the access and refresh tokens issued together share it.
+    """
+    return hmac.new(secret_key, digestmod=hashlib.sha256)
 
 
-# The tokenUrl below is patched at app startup when we know it.
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="PLACEHOLDER", auto_error=False)
-api_key_query = APIKeyQuery(name="api_key", auto_error=False)
-api_key_header = APIKeyAuthorizationHeader(
-    name="Authorization",
-    description="Prefix value with 'Apikey ' as in, 'Apikey SECRET'",
-)
-api_key_cookie = APIKeyCookie(name=API_KEY_COOKIE_NAME, auto_error=False)
+def encode_token(payload, secret_key):
+    "Encode a payload as a JWT signed with HMAC-SHA256."
+    # orjson writes compact JSON, as is conventional for JWTs, and is much
+    # faster than the json module.
+    return sign_token(orjson.dumps(payload), secret_key)
+
 
+def sign_token(payload_json, secret_key):
+    "Encode a payload, already serialized to JSON bytes, as a signed JWT."
+    signing_input = _JWT_HEADER_B64 + b"." + base64url_encode(payload_json)
+    mac = _keyed_hmac(secret_key).copy()
+    mac.update(signing_input)
+    signature = mac.digest()
+    return (signing_input + b"." + base64url_encode(signature)).decode()
 
-def create_access_token(data, secret_key, expires_delta):
-    to_encode = data.copy()
-    expire = utcnow() + expires_delta
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
+
+def warm_up_token_signing(secret_keys):
+    """
+    Sign and verify one throwaway token, to be called at startup.
+
+    This initializes the HMAC-SHA256 machinery and precomputes the keyed HMAC
+    state for every secret key, so that the first authenticated request does
+    not pay for it.
+    """
+    if not secret_keys:
+        return
+    for secret_key in secret_keys:
+        _keyed_hmac(secret_key)
+    token = encode_token({"exp": int(time.time()) + 60}, secret_keys[0])
+    decode_token(token, secret_keys)
+
+
+def create_access_token(data, secret_key, expires_in):
+    # Expiration is a NumericDate: seconds since the epoch, truncated.
+    expire = int(time.time() + expires_in)
+    # Build the claims in one step. This does not modify data.
+    to_encode = {**data, "exp": expire, "type": "access"}
+    encoded_jwt = encode_token(to_encode, secret_key)
     return encoded_jwt
 
 
-def create_refresh_token(session_id, secret_key, expires_delta):
-    expire = utcnow() + expires_delta
-    to_encode = {
-        "type": "refresh",
-        "sid": session_id,
-        "exp": expire,
-    }
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
+def create_refresh_token(session_id, secret_key, expires_in):
+    expire = int(time.time() + expires_in)
+    # The payload has a fixed shape, so write its JSON directly rather than
+    # building a dict to serialize. Only the session_id string needs quoting.
+    payload_json = b'{"type":"refresh","sid":%b,"exp":%d}' % (
+        orjson.dumps(session_id),
+        expire,
+    )
+    encoded_jwt = sign_token(payload_json, secret_key)
     return encoded_jwt
 
 
+# Index into secret_keys of the key that most recently verified a token
+_last_good_key_index = 0
+
+
 def decode_token(token, secret_keys):
     credentials_exception = HTTPException(
         status_code=HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Split and decode the token once, up front, rather than once per key.
+    try:
+        header_b64, payload_b64, signature_b64 = token.encode("ascii").split(b".")
+        header = orjson.loads(base64url_decode(header_b64))
+        signature = base64url_decode(signature_b64)
+    except ValueError:
+        # Not a JWT at all. (Decoding errors are subclasses of ValueError.)
+        raise credentials_exception
+    if not (isinstance(header, dict) and header.get("alg") == ALGORITHM):
+        raise credentials_exception
     # The first key in settings.secret_keys is used for *encoding*.
     # All keys are tried for *decoding* until one works or they all
     # fail. They supports key rotation.
-    for secret_key in secret_keys:
-        try:
-            payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
+    # Start with whichever key worked last time. Around a rotation, most tokens
+    # are signed by the same key, so this usually needs only one HMAC.
+    if not secret_keys:
+        # No keys are configured, so no token can be valid.
+        raise credentials_exception
+    global _last_good_key_index
+    signing_input = header_b64 + b"." + payload_b64
+    num_keys = len(secret_keys)
+    start = _last_good_key_index % num_keys
+    for offset in range(num_keys):
+        index = (start + offset) % num_keys
+        mac = _keyed_hmac(secret_keys[index]).copy()
+        mac.update(signing_input)
+        if hmac.compare_digest(mac.digest(), signature):
+            _last_good_key_index = index
             break
-        except ExpiredSignatureError:
-            # Do not let this be caught below with the other JWTError types.
-            raise
-        except JWTError:
-            # Try the next key in the key rotation.
-            continue
+        # Otherwise, try the next key in the key rotation.
     else:
         raise credentials_exception
+    # The signature is valid, so we issued this payload and know its contents.
+    payload = orjson.loads(base64url_decode(payload_b64))
+    if payload["exp"] <= time.time():
+        raise ExpiredSignatureError("Signature has expired")
     return payload
 
 
-async def get_api_key(
-    api_key_query: str = Security(api_key_query),
-    api_key_header: str = Security(api_key_header),
-    api_key_cookie: str = Security(api_key_cookie),
-):
-    for api_key in [api_key_query, api_key_header, api_key_cookie]:
-        if api_key is not None:
-            return api_key
-    return None
+def _decoded_token_ttu(_key, payload, now):
+    """
+    Retain decoded tokens for DECODED_TOKEN_CACHE_TTU_SECONDS or until they expire.
+    """
+    return now + min(DECODED_TOKEN_CACHE_TTU_SECONDS, payload["exp"] - time.time())
+
+
+_decoded_token_cache = cachetools.TLRUCache(
+    DECODED_TOKEN_CACHE_MAX_SIZE, _decoded_token_ttu
+)
+_decoded_token_cache_lock = threading.Lock()
+
+
+def decode_token_cached(token, secret_keys):
+    """
+    Decode a token, reusing the result if this token was decoded recently.
+
+    Expired tokens are evicted from the cache, so they are always passed on
+    to decode_token, which raises ExpiredSignatureError.
+    """
+    cache_key = (hashlib.blake2b(token.encode(), digest_size=16).digest(), secret_keys)
+    with _decoded_token_cache_lock:
+        payload = _decoded_token_cache.get(cache_key)
+    if payload is None:
+        payload = decode_token(token, secret_keys)
+        with _decoded_token_cache_lock:
+            _decoded_token_cache[cache_key] = payload
+    return payload
+
+
+def get_api_key_from_authorization_header(request: Request) -> Optional[str]:
+    """
+    Expect a header like
+
+    Authorization: Apikey SECRET
+
+    where Apikey is case-insensitive.
+    """
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    scheme, param = get_authorization_scheme_param(authorization)
+    if scheme.lower() == "bearer":
+        return None
+    if scheme.lower() != "apikey":
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=(
+                "Authorization header must include the authorization type "
+                "followed by a space and then the secret, as in "
+                "'Bearer SECRET' or 'Apikey SECRET'. "
+            ),
+        )
+    return param
+
+
+async def get_api_key(request: Request):
+    """
+    Get API key from, in order of precedence:
+    - 'api_key' query parameter
+    - header 'Authorization: Apikey ...'
+    - cookie 'tiled_api_key'
+
+    These are read directly from the request, and each source is only consulted
+    if the ones before it have no key. (Declaring them as three FastAPI Security
+    dependencies would resolve all three on every request.) They are described
+    in the OpenAPI schema by API_KEY_SECURITY_SCHEMES.
+    """
+    # An empty query parameter or cookie counts as missing, but an empty key in
+    # the Authorization header is passed on, and rejected, as an invalid key.
+    api_key = request.query_params.get(API_KEY_QUERY_PARAMETER) or None
+    if api_key is None:
+        api_key = get_api_key_from_authorization_header(request)
+    if api_key is None:
+        api_key = request.cookies.get(API_KEY_COOKIE_NAME) or None
+    return api_key
 
 
 def headers_for_401(request: Request, security_scopes: SecurityScopes):
@@ -225,7 +372,7 @@ async def get_decoded_access_token(
     if not access_token:
         return None
     try:
-        payload = decode_token(access_token, settings.secret_keys)
+        payload = decode_token_cached(access_token, settings.secret_keys_bytes)
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED,
@@ -304,32 +451,11 @@ async def get_current_principal(
                 )
         else:
             # Tiled is in a "single user" mode with only one API key.
-            if secrets.compare_digest(api_key, settings.single_user_api_key):
-                principal = SpecialUsers.admin
-                scopes = {
-                    "read:metadata",
-                    "read:data",
-                    "write:metadata",
-                    "write:data",
-                    "create",
-                    "register",
-                    "metrics",
-                }
-            else:
-                raise HTTPException(
-                    status_code=HTTP_401_UNAUTHORIZED,
-                    detail="Invalid API key",
-                    headers=headers_for_401(request, security_scopes),
-                )
-        # If we made it to this point, we have a valid API key.
-        # If the API key was given in query param, move to cookie.
-        # This is convenient for browser-based access.
-        if ("api_key" in request.query_params) and (
-            request.cookies.get(API_KEY_COOKIE_NAME) != api_key
-        ):
-            request.state.cookies_to_set.append(
-                {"key": API_KEY_COOKIE_NAME, "value": api_key}
+            principal, scopes = check_single_user_api_key(
+                request, security_scopes, api_key, settings
             )
+        # If we made it to this point, we have a valid API key.
+        move_api_key_to_cookie(request, api_key)
     elif decoded_access_token is not None:
         principal = schemas.Principal(
             uuid=uuid_module.UUID(hex=decoded_access_token["sub"]),
@@ -342,18 +468,106 @@ async def get_current_principal(
         scopes = decoded_access_token["scp"]
     else:
         # No form of authentication is present.
-        principal = SpecialUsers.public
-        # Is anonymous public access permitted?
-        if settings.allow_anonymous_access:
-            # Any user who can see the server can make unauthenticated requests.
-            # This is a sentinel that has special meaning to the authorization
-            # code (the access control policies).
-            scopes = {"read:metadata", "read:data"}
-        else:
-            # In this mode, there may still be entries that are visible to all,
-            # but users have to authenticate as *someone* to see anything.
-            # They can still access the /  and /docs routes.
-            scopes = {}
+        principal, scopes = anonymous_principal_and_scopes(settings)
+    enforce_scopes(request, security_scopes, scopes)
+    return principal
+
+
+async def get_current_principal_single_user(
+    request: Request,
+    security_scopes: SecurityScopes,
+    api_key: str = Depends(get_api_key),
+    settings: BaseSettings = Depends(get_settings),
+):
+    """
+    Get current Principal on a server with no authentication providers.
+
+    This stands in for get_current_principal via app.dependency_overrides.
+    Without providers, no access tokens are issued and there is no database of
+    API keys, so this skips the OAuth2 scheme, token decoding, and database
+    session that get_current_principal depends on.
+
+    Credentials that are present but not valid here, including an empty API key
+    in the Authorization header and any Bearer token, are rejected with 401
+    rather than ignored, so the client is not silently treated as anonymous.
+    """
+    if api_key is not None:
+        principal, scopes = check_single_user_api_key(
+            request, security_scopes, api_key, settings
+        )
+        move_api_key_to_cookie(request, api_key)
+    else:
+        scheme, _ = get_authorization_scheme_param(request.headers.get("Authorization"))
+        if scheme.lower() == "bearer":
+            raise HTTPException(
+                status_code=HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers=headers_for_401(request, security_scopes),
+            )
+        principal, scopes = anonymous_principal_and_scopes(settings)
+    enforce_scopes(request, security_scopes, scopes)
+    return principal
+
+
+async def get_decoded_access_token_single_user():
+    "Stand-in for get_decoded_access_token on a server that issues no tokens"
+    return None
+
+
+def check_single_user_api_key(request, security_scopes, api_key, settings):
+    # Compare as bytes, because compare_digest rejects non-ASCII str.
+    if not secrets.compare_digest(
+        api_key.encode(), settings.single_user_api_key.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+            headers=headers_for_401(request, security_scopes),
+        )
+    principal = SpecialUsers.admin
+    scopes = {
+        "read:metadata",
+        "read:data",
+        "write:metadata",
+        "write:data",
+        "create",
+        "register",
+        "metrics",
+    }
+    return principal, scopes
+
+
+def move_api_key_to_cookie(request, api_key):
+    # If the API key was given in query param, move to cookie.
+    # This is convenient for browser-based access.
+    # Compare as bytes, as in check_single_user_api_key.
+    if (API_KEY_QUERY_PARAMETER in request.query_params) and not (
+        secrets.compare_digest(
+            request.cookies.get(API_KEY_COOKIE_NAME, "").encode(), api_key.encode()
+        )
+    ):
+        request.state.cookies_to_set.append(
+            {"key": API_KEY_COOKIE_NAME, "value": api_key}
+        )
+
+
+def anonymous_principal_and_scopes(settings):
+    principal = SpecialUsers.public
+    # Is anonymous public access permitted?
+    if settings.allow_anonymous_access:
+        # Any user who can see the server can make unauthenticated requests.
+        # This is a sentinel that has special meaning to the authorization
+        # code (the access control policies).
+        scopes = {"read:metadata", "read:data"}
+    else:
+        # In this mode, there may still be entries that are visible to all,
+        # but users have to authenticate as *someone* to see anything.
+        # They can still access the /  and /docs routes.
+        scopes = {}
+    return principal, scopes
+
+
+def enforce_scopes(request, security_scopes, scopes):
     # Scope enforcement happens here.
     # https://fastapi.tiangolo.com/advanced/security/oauth2-scopes/
     if not set(security_scopes.scopes).issubset(scopes):
@@ -373,7 +587,6 @@ async def get_current_principal(
             ),
             headers=headers_for_401(request, security_scopes),
         )
-    return principal
 
 
 async def create_pending_session(db):
@@ -478,13 +691,15 @@ async def create_tokens_from_session(settings, db, session, provider):
     }
     access_token = create_access_token(
         data=data,
-        expires_delta=settings.access_token_max_age,
-        secret_key=settings.secret_keys[0],  # Use the *first* secret key to encode.
+        expires_in=settings.access_token_max_age_seconds,
+        # Use the *first* secret key to encode.
+        secret_key=settings.secret_keys_bytes[0],
     )
     refresh_token = create_refresh_token(
         session_id=session.uuid.hex,
-        expires_delta=settings.refresh_token_max_age,
-        secret_key=settings.secret_keys[0],  # Use the *first* secret key to encode.
+        expires_in=settings.refresh_token_max_age_seconds,
+        # Use the *first* secret key to encode.
+        secret_key=settings.secret_keys_bytes[0],
     )
     # Include the identity. This is not stored as part of the session.
     # Once you are logged in, it does not matter *how* you logged in.
@@ -499,9 +714,9 @@ async def create_tokens_from_session(settings, db, session, provider):
     ).scalar()
     return {
         "access_token": access_token,
-        "expires_in": settings.access_token_max_age / UNIT_SECOND,
+        "expires_in": settings.access_token_max_age_seconds,
         "refresh_token": refresh_token,
-        "refresh_token_expires_in": settings.refresh_token_max_age / UNIT_SECOND,
+        "refresh_token_expires_in": settings.refresh_token_max_age_seconds,
         "token_type": "bearer",
         "identity": {"id": identity.id, "provider": provider},
         "principal": principal.uuid.hex,
@@ -530,7 +745,7 @@ def build_auth_code_route(authenticator, provider):
             user_session_state.state,
         )
         tokens = await create_tokens_from_session(settings, db, session, provider)
-        return tokens
+        return ORJSONResponse(tokens)
 
     return route
 
@@ -703,7 +918,7 @@ def build_device_code_token_route(authenticator, provider):
         await db.delete(pending_session)
         await db.commit()
         tokens = await create_tokens_from_session(settings, db, session, provider)
-        return tokens
+        return ORJSONResponse(tokens)
 
     return route
 
@@ -737,7 +952,7 @@ def build_handle_credentials_route(
             state=user_session_state.state,
         )
         tokens = await create_tokens_from_session(settings, db, session, provider)
-        return tokens
+        return ORJSONResponse(tokens)
 
     return route
 
@@ -934,7 +1149,9 @@ async def apikey_for_principal(
 
 
 @base_authentication_router.post(
-    "/session/refresh", response_model=schemas.AccessAndRefreshTokens
+    "/session/refresh",
+    response_model=schemas.AccessAndRefreshTokens,
+    response_class=ORJSONResponse,
 )
 async def refresh_session(
     request: Request,
@@ -957,7 +1174,7 @@ async def revoke_session(
 ):
     "Mark a Session as revoked so it cannot be refreshed again."
     request.state.endpoint = "auth"
-    payload = decode_token(refresh_token.refresh_token, settings.secret_keys)
+    payload = decode_token(refresh_token.refresh_token, settings.secret_keys_bytes)
     session_id = payload["sid"]
     # Find this session in the database.
     session = await lookup_valid_session(db, session_id)
@@ -996,7 +1213,7 @@ async def revoke_session_by_id(
 
 async def slide_session(refresh_token, settings, db):
     try:
-        payload = decode_token(refresh_token, settings.secret_keys)
+        payload = decode_token(refresh_token, settings.secret_keys_bytes)
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED,
@@ -1036,19 +1253,21 @@ async def slide_session(refresh_token, settings, db):
     }
     access_token = create_access_token(
         data=data,
-        expires_delta=settings.access_token_max_age,
-        secret_key=settings.secret_keys[0],  # Use the *first* secret key to encode.
+        expires_in=settings.access_token_max_age_seconds,
+        # Use the *first* secret key to encode.
+        secret_key=settings.secret_keys_bytes[0],
     )
     new_refresh_token = create_refresh_token(
         session_id=payload["sid"],
-        expires_delta=settings.refresh_token_max_age,
-        secret_key=settings.secret_keys[0],  # Use the *first* secret key to encode.
+        expires_in=settings.refresh_token_max_age_seconds,
+        # Use the *first* secret key to encode.
+        secret_key=settings.secret_keys_bytes[0],
     )
     return {
         "access_token": access_token,
-        "expires_in": settings.access_token_max_age / UNIT_SECOND,
+        "expires_in": settings.access_token_max_age_seconds,
         "refresh_token": new_refresh_token,
-        "refresh_token_expires_in": settings.refresh_token_max_age / UNIT_SECOND,
+        "refresh_token_expires_in": settings.refresh_token_max_age_seconds,
         "token_type": "bearer",
     }
 
@@ -2,7 +2,7 @@ import collections
 import os
 import secrets
 from datetime import timedelta
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import Any, List, Optional
 
 from pydantic_settings import BaseSettings
@@ -67,6 +67,27 @@ class Settings(BaseSettings):
     )
     expose_raw_assets: bool = True
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Settings are reassigned in place (see build_app). Discard every value
+        # derived from them by a cached_property, to be recomputed on access.
+        for attr, descriptor in vars(type(self)).items():
+            if isinstance(descriptor, cached_property):
+                self.__dict__.pop(attr, None)
+
+    @cached_property
+    def secret_keys_bytes(self):
+        # Encode the keys once, not every time a token is signed or verified.
+        return tuple(secret_key.encode("utf-8") for secret_key in self.secret_keys)
+
+    @cached_property
+    def access_token_max_age_seconds(self):
+        return self.access_token_max_age.total_seconds()
+
+    @cached_property
+    def refresh_token_max_age_seconds(self):
+        return self.refresh_token_max_age.total_seconds()
+
     @property
     def database_settings(self):
         # The point of this alias is to return a hashable cache key for use in